@@ -1,22 +1,39 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os, re, json, pathlib, logging, asyncio, socket
+import os, re, json, time, pathlib, logging, asyncio, socket, hashlib, threading
 from typing import List, Dict, Optional
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field, asdict
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
 from datetime import datetime, timedelta
 
+import httpx
 import requests
+
+# orjson opsional: decode JSON C-level untuk respons CoinGecko;
+# fallback ke parser bawaan response bila tidak terpasang.
+try:
+    import orjson
+    def _json_body(r):
+        return orjson.loads(r.content)
+except Exception:
+    orjson = None
+    def _json_body(r):
+        return r.json()
+from requests.adapters import HTTPAdapter, Retry
 from bs4 import BeautifulSoup
 
 from telegram import (
     Update, InlineKeyboardButton, InlineKeyboardMarkup,
 )
+from telegram.error import BadRequest
 from telegram.ext import (
     ApplicationBuilder, CommandHandler, MessageHandler,
-    ContextTypes, filters, CallbackQueryHandler,
+    ContextTypes, filters, CallbackQueryHandler, AIORateLimiter,
 )
+from telegram.request import HTTPXRequest
 
 # ===================== ENV & LOGGING =====================
 try:
@@ -30,6 +47,7 @@ OPENAI_API_KEY   = os.getenv("OPENAI_API_KEY", "").strip()  # opsional
 FIAT_DEFAULT     = os.getenv("FIAT_DEFAULT", "usd").lower()
 AIR_REFRESH_HOURS = int(os.getenv("AIR_REFRESH_HOURS", "6"))
 AIR_CACHE        = os.getenv("AIR_CACHE", "airdrops_cache.json")
+WEBHOOK_URL      = os.getenv("WEBHOOK_URL", "").strip()  # kosong = mode polling
 
 if not BOT_TOKEN:
     raise SystemExit("BOT_TOKEN belum diisi. Set di .env atau environment variable.")
@@ -42,15 +60,52 @@ log = logging.getLogger("airdropcore.bot")
 
 # ===================== OpenAI (opsional) =====================
 client = None
+RateLimitError: type = Exception  # dioverride bila openai terpasang
 try:
     if OPENAI_API_KEY:
-        from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_API_KEY)
+        from openai import AsyncOpenAI, RateLimitError
+        client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 except Exception as e:
     log.warning("OpenAI client nonaktif: %s", e)
     client = None
 log.info("OpenAI client aktif" if client else "OpenAI client nonaktif")
 
+# Throttle klien OpenAI: max 20 request/menit bot-wide supaya spike pesan
+# tidak menghanguskan budget TPM dan berakhir "Error AI: 429".
+_AI_WINDOW = 60.0
+_AI_MAX_CALLS = 20
+# Semaphore membatasi jumlah call OpenAI yang berjalan bersamaan;
+# limiter di bawah membatasi laju. Keduanya saling melengkapi.
+OPENAI_SEM = asyncio.Semaphore(int(os.getenv("OPENAI_CONCURRENCY", "8")))
+_ai_call_times: "deque[float]" = deque()
+_ai_gate = asyncio.Lock()
+
+# Cooldown AI per user untuk fallback teks bebas: satu user tidak bisa
+# menghabiskan budget limiter bot-wide sendirian. Saat penuh, entri yang
+# cooldown-nya sudah lewat dibuang dulu supaya map tidak tumbuh terus.
+_AI_USER_COOLDOWN = 5.0  # detik
+_AI_USER_LAST: Dict[int, float] = {}
+_AI_USER_LAST_MAX = 10_000
+
+async def ai_limiter_acquire() -> None:
+    async with _ai_gate:
+        now = time.monotonic()
+        while _ai_call_times and now - _ai_call_times[0] > _AI_WINDOW:
+            _ai_call_times.popleft()
+        if len(_ai_call_times) >= _AI_MAX_CALLS:
+            await asyncio.sleep(max(_AI_WINDOW - (now - _ai_call_times[0]), 0))
+        _ai_call_times.append(time.monotonic())
+
+# ===================== Lock per chat =====================
+# Kerja berat (scrape/AI) serial di dalam satu chat, paralel antar chat.
+CHAT_LOCKS: Dict[int, asyncio.Lock] = {}
+
+def get_chat_lock(chat_id: int) -> asyncio.Lock:
+    lock = CHAT_LOCKS.get(chat_id)
+    if lock is None:
+        lock = CHAT_LOCKS[chat_id] = asyncio.Lock()
+    return lock
+
 # ===================== Preferensi FIAT per chat =====================
 FIAT_PREFS: Dict[int, str] = {}   # chat_id -> fiat
 
@@ -60,6 +115,37 @@ def get_chat_fiat(chat_id: int) -> str:
 def set_chat_fiat(chat_id: int, fiat: str) -> None:
     FIAT_PREFS[chat_id] = fiat.lower()
 
+# ===================== HTTP session bersama =====================
+# Satu Session untuk semua call keluar: koneksi TCP+TLS dipakai ulang
+# (hemat ~100-300ms handshake per request) + retry otomatis untuk 429/5xx.
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=16, pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.3,
+                      status_forcelist=[429, 500, 502, 503, 504]),
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+# Klien async untuk path harga: API call jalan native di event loop tanpa
+# worker thread. httpx sudah jadi dependency lewat python-telegram-bot.
+_HTTPX: Optional[httpx.AsyncClient] = None
+
+def get_http() -> httpx.AsyncClient:
+    global _HTTPX
+    if _HTTPX is None or _HTTPX.is_closed:
+        _HTTPX = httpx.AsyncClient(
+            timeout=20,
+            limits=httpx.Limits(max_keepalive_connections=50),
+            # brotli terpasang => payload JSON besar menyusut ~5-8x di kawat
+            headers={"Accept-Encoding": "gzip, br"},
+        )
+    return _HTTPX
+
+async def _close_http(app) -> None:
+    if _HTTPX is not None and not _HTTPX.is_closed:
+        await _HTTPX.aclose()
+
 # ===================== Crypto helpers =====================
 CG_BASE = "https://api.coingecko.com/api/v3"
 
@@ -71,52 +157,126 @@ SYMBOL_MAP = {
     "apt":"aptos","near":"near","fil":"filecoin","bch":"bitcoin-cash","etc":"ethereum-classic",
 }
 
-def resolve_coin_id(sym: str) -> Optional[str]:
+_COIN_ID_RE = re.compile(r"[a-z0-9-]{3,}")
+# Hasil lookup /search di-memoize: simbol aneh yang sama tidak memicu
+# round-trip CoinGecko berulang (termasuk hasil \"tidak ketemu\").
+_RESOLVE_CACHE: Dict[str, Optional[str]] = {}
+_RESOLVE_CACHE_MAX = 1024
+
+async def resolve_coin_id(sym: str) -> Optional[str]:
     s = sym.lower().strip()
-    if s in SYMBOL_MAP:
-        return SYMBOL_MAP[s]
-    if re.fullmatch(r"[a-z0-9-]{3,}", s):
+    cid = SYMBOL_MAP.get(s)  # satu probe dict, bukan `in` + indexing
+    if cid:
+        return cid
+    if _COIN_ID_RE.fullmatch(s):
         return s
+    if s in _RESOLVE_CACHE:
+        return _RESOLVE_CACHE[s]
     try:
-        r = requests.get(f"{CG_BASE}/search", params={"query": s}, timeout=20)
+        r = await get_http().get(f"{CG_BASE}/search", params={"query": s})
         r.raise_for_status()
-        data = r.json()
-        if data.get("coins"):
-            return data["coins"][0]["id"]
+        data = _json_body(r)
+        cid = data["coins"][0]["id"] if data.get("coins") else None
+        if len(_RESOLVE_CACHE) >= _RESOLVE_CACHE_MAX:
+            _RESOLVE_CACHE.clear()
+        _RESOLVE_CACHE[s] = cid
+        return cid
     except Exception as e:
         log.warning("resolve_coin_id gagal untuk %s: %s", sym, e)
     return None
 
-def fetch_price(ids: List[str], fiat: str) -> Dict[str, Dict[str, float]]:
+# Cache harga ber-TTL: N user menanyakan pair yang sama dalam 60 detik
+# cukup 1x round-trip ke CoinGecko; lock menjaga miss bersamaan tidak
+# jadi thundering herd.
+_PRICE_TTL = 60  # detik
+_PRICE_CACHE: Dict[tuple, tuple] = {}  # (ids, fiat) -> (ts, data)
+_PRICE_FETCH_LOCK = asyncio.Lock()
+
+async def fetch_price(ids: List[str], fiat: str) -> Dict[str, Dict[str, float]]:
+    # key di-sort supaya "eth,btc" dan "btc,eth" berbagi entri yang sama
+    key = (tuple(sorted(ids)), fiat)
+    hit = _PRICE_CACHE.get(key)
+    if hit and time.time() - hit[0] < _PRICE_TTL:
+        return hit[1]
+    async with _PRICE_FETCH_LOCK:
+        hit = _PRICE_CACHE.get(key)
+        if hit and time.time() - hit[0] < _PRICE_TTL:
+            return hit[1]
+        data = await _fetch_price_remote(ids, fiat)
+        if data:
+            now = time.time()
+            # buang entri basi sekalian supaya cache tidak tumbuh tanpa batas
+            for k in [k for k, v in _PRICE_CACHE.items() if now - v[0] > 3 * _PRICE_TTL]:
+                _PRICE_CACHE.pop(k, None)
+            _PRICE_CACHE[key] = (now, data)
+        return data
+
+async def _fetch_price_remote(ids: List[str], fiat: str) -> Dict[str, Dict[str, float]]:
     try:
-        r = requests.get(
+        r = await get_http().get(
             f"{CG_BASE}/simple/price",
             params={
                 "ids": ",".join(ids),
                 "vs_currencies": fiat,
                 "include_24hr_change": "true",
             },
-            timeout=20
         )
         r.raise_for_status()
-        return r.json()
+        return _json_body(r)
     except Exception as e:
         log.warning("fetch_price gagal: %s", e)
         return {}
 
+# Micro-batch harga: kumpulkan permintaan (cid, fiat) selama 50ms lalu
+# gabung jadi satu call /simple/price multi-coin. N user menanyakan coin
+# berbeda dalam jendela yang sama => 1 round-trip, bukan N.
+_BATCH_WINDOW = 0.05  # detik
+_price_pending: Dict[str, Dict[str, List[asyncio.Future]]] = {}  # fiat -> cid -> waiters
+
+async def batched_fetch_price(cid: str, fiat: str) -> Dict[str, Dict[str, float]]:
+    loop = asyncio.get_running_loop()
+    fut: asyncio.Future = loop.create_future()
+    per_fiat = _price_pending.setdefault(fiat, {})
+    first = not per_fiat
+    per_fiat.setdefault(cid, []).append(fut)
+    if first:
+        loop.call_later(_BATCH_WINDOW,
+                        lambda: asyncio.ensure_future(_flush_price_batch(fiat)))
+    return await fut
+
+async def _flush_price_batch(fiat: str) -> None:
+    per_fiat = _price_pending.pop(fiat, {})
+    if not per_fiat:
+        return
+    data = await fetch_price(sorted(per_fiat), fiat)
+    for futs in per_fiat.values():
+        for f in futs:
+            if not f.done():
+                f.set_result(data)
+
 def fmt_price(val: float, fiat: str) -> str:
     try:
         return f"{val:,.4f} {fiat.upper()}"
     except Exception:
         return f"{val} {fiat.upper()}"
 
-# Natural text parsing
-PAIR_PATTERN   = re.compile(r"^\s*([0-9.]+)\s*([a-zA-Z0-9]+)\s+([a-zA-Z0-9]+)\s*$")  # "0.25 eth idr"
-COIN_FIAT_PAT  = re.compile(r"^\s*([a-zA-Z0-9]+)[/ ]+([a-zA-Z0-9]+)\s*$")            # "btc usd"
-SINGLE_COIN    = re.compile(r"^\s*([a-zA-Z0-9]{2,10})\s*$")                          # "btc"
+# Natural text parsing: satu pattern gabungan (named groups), jadi
+# text_router cukup satu kali scan untuk menentukan cabang.
+RX_TEXT = re.compile(
+    r"^\s*(?:"
+    r"(?P<amt>[0-9.]+)\s*(?P<amt_sym>[a-z0-9]+)\s+(?P<amt_fiat>[a-z0-9]+)"  # "0.25 eth idr"
+    r"|(?P<p_sym>[a-z0-9]+)[/ ]+(?P<p_fiat>[a-z0-9]+)"                       # "btc usd"
+    r"|(?P<sym>[a-z0-9]{2,10})"                                              # "btc"
+    r")\s*$",
+    # input simbol/fiat selalu ASCII; re.ASCII melepas tabel casefold
+    # unicode dari case-insensitive match per karakter
+    re.IGNORECASE | re.ASCII,
+)
 
 # ===================== Airdrop: Model & Helpers =====================
-@dataclass
+# slots=True: layout instance jadi struct tetap tanpa __dict__ —
+# hemat memori per objek dan akses atribut sedikit lebih cepat.
+@dataclass(slots=True)
 class Airdrop:
     slug: str
     name: str
@@ -126,180 +286,336 @@ class Airdrop:
     source: str = ""
     tasks: List[str] = field(default_factory=list)
 
+# Tombol inline hasil enrich disimpan di sidecar per slug (bukan atribut
+# dinamis di instance) supaya kompatibel dengan __slots__ dan tidak ikut
+# terserialisasi ke cache JSON.
+_AIR_BUTTONS: Dict[str, List[InlineKeyboardButton]] = {}
+
 AIRDROPS: List[Airdrop] = []
+# Token nama dipecah sekali saat daftar di-load, bukan per pencarian:
+# skoring /tugas jadi operasi irisan set murni tanpa alokasi string.
+AIR_NAME_TOKENS: List[frozenset] = []
+AIR_NAME_LOWER: List[str] = []
+# Indeks trigram slug+nama -> set posisi di AIRDROPS; /tugas memfilter
+# kandidat lewat irisan posting list alih-alih scan substring O(N).
+AIR_TRIGRAMS: "defaultdict[str, set]" = defaultdict(set)
 LAST_AIR_UPDATE: Optional[datetime] = None
 
+def _trigrams(s: str) -> set:
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+# Plafon jumlah entri: scrape patologis (selector nyangkut di elemen
+# berulang) tidak membuat daftar + indeks turunannya membengkak.
+_AIRDROPS_MAX = 1000
+
+def set_airdrops(new_list: List[Airdrop]) -> None:
+    AIRDROPS.clear()
+    AIRDROPS.extend(new_list[:_AIRDROPS_MAX])
+    _PAGE_CACHE.clear()
+    AIR_NAME_LOWER.clear()
+    AIR_NAME_LOWER.extend(a.name.lower() for a in AIRDROPS)
+    AIR_NAME_TOKENS.clear()
+    AIR_NAME_TOKENS.extend(frozenset(n.split()) for n in AIR_NAME_LOWER)
+    AIR_TRIGRAMS.clear()
+    for i, a in enumerate(AIRDROPS):
+        for g in _trigrams(f"{a.slug} {AIR_NAME_LOWER[i]}"):
+            AIR_TRIGRAMS[g].add(i)
+
+def fuzzy_find(key: str) -> Optional[Airdrop]:
+    """Cari airdrop via overlap token nama; dipakai bila substring match gagal."""
+    qt = frozenset(key.split())
+    if not qt or not AIRDROPS:
+        return None
+    best_i, best_s = -1, 0
+    for i, toks in enumerate(AIR_NAME_TOKENS):
+        s = len(qt & toks)
+        if s > best_s:
+            best_i, best_s = i, s
+    return AIRDROPS[best_i] if best_s > 0 else None
+
 UA = {"User-Agent": "Mozilla/5.0 (compatible; AirdropCoreBot/2.2)"}
+SESSION.headers.update(UA)  # default untuk semua call keluar via SESSION
+
+# Batasi kerja scraper: max 8 request paralel per host, baca max 512KB per
+# halaman, dan hanya terima konten HTML. Menjaga memori bot & sopan ke remote.
+HOST_SEMS: "defaultdict[str, threading.Semaphore]" = defaultdict(lambda: threading.Semaphore(8))
+_FETCH_MAX_BYTES = 512 * 1024
+_FETCH_TIMEOUT = (5, 15)  # (connect, read)
+
+# Cache HTML per URL ber-TTL: refresh terjadwal dan /airupdate manual yang
+# berdekatan tidak mendownload + parse ulang halaman yang hampir pasti sama.
+# TTL = setengah interval refresh supaya job berkala selalu melihat konten baru.
+_HTML_TTL = max(AIR_REFRESH_HOURS * 1800, 300)  # detik
+_HTML_CACHE_MAX = 32
+_HTML_CACHE: Dict[str, tuple] = {}  # url -> (expiry_monotonic, html)
+
+def fetch_html(url: str) -> str:
+    hit = _HTML_CACHE.get(url)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+    html = _fetch_html_remote(url)
+    if len(_HTML_CACHE) >= _HTML_CACHE_MAX:
+        now = time.monotonic()
+        for k in [k for k, v in _HTML_CACHE.items() if v[0] <= now]:
+            _HTML_CACHE.pop(k, None)
+    if len(_HTML_CACHE) < _HTML_CACHE_MAX:
+        _HTML_CACHE[url] = (time.monotonic() + _HTML_TTL, html)
+    return html
+
+# Validator ETag/Last-Modified per URL: setelah TTL _HTML_CACHE lewat,
+# kirim conditional GET — respons 304 berarti pakai ulang body tersimpan
+# tanpa download + parse ulang. Body bisa sampai _FETCH_MAX_BYTES per URL
+# dan URL detail berganti tiap refresh scrape, jadi dibatasi LRU.
+_COND_CACHE: "OrderedDict[str, tuple]" = OrderedDict()  # url -> (etag, last_modified, html)
+_COND_CACHE_MAX = 64
+
+def _fetch_html_remote(url: str) -> str:
+    host = urlsplit(url).netloc
+    cond = _COND_CACHE.get(url)
+    headers = {}
+    if cond:
+        _COND_CACHE.move_to_end(url)
+        if cond[0]:
+            headers["If-None-Match"] = cond[0]
+        if cond[1]:
+            headers["If-Modified-Since"] = cond[1]
+    with HOST_SEMS[host]:
+        r = SESSION.get(url, timeout=_FETCH_TIMEOUT, stream=True,
+                        headers=headers or None)
+        try:
+            if r.status_code == 304 and cond:
+                return cond[2]
+            r.raise_for_status()
+            ctype = r.headers.get("Content-Type", "")
+            if not (ctype.startswith("text/") or ctype.startswith("application/xhtml")):
+                raise RuntimeError(f"Content-Type bukan HTML: {ctype!r}")
+            body = b""
+            for part in r.iter_content(65536):
+                body += part
+                if len(body) >= _FETCH_MAX_BYTES:
+                    break
+            html = body.decode(r.encoding or "utf-8", errors="replace")
+            etag = r.headers.get("ETag")
+            last_mod = r.headers.get("Last-Modified")
+            if etag or last_mod:
+                _COND_CACHE[url] = (etag, last_mod, html)
+                _COND_CACHE.move_to_end(url)
+                while len(_COND_CACHE) > _COND_CACHE_MAX:
+                    _COND_CACHE.popitem(last=False)
+            else:
+                _COND_CACHE.pop(url, None)
+            return html
+        finally:
+            r.close()
 
 def _clean_text(s: Optional[str]) -> str:
-    if not s: return ""
-    return re.sub(r"\s+", " ", s).strip()
+    # split()/join C-level: kolaps whitespace tanpa masuk mesin regex;
+    # dipanggil di loop terdalam semua scraper.
+    return " ".join(s.split()) if s else ""
+
+# Tanda baca ASCII dibuang lewat tabel translate (satu pass C); regex
+# [^\w\s-] hanya jalan untuk nama ber-unicode (emoji/simbol), kasus langka.
+_SLUG_DROP = str.maketrans("", "", "!\"#$%&'()*+,./:;<=>?@[\\]^`{|}~")
+_SLUG_NOWORD = re.compile(r"[^\w\s-]")
+_SLUG_DASH = re.compile(r"-{2,}")
 
 def _slugify(s: str) -> str:
-    s = s.lower().strip()
-    s = re.sub(r"[^\w\s-]", "", s)
-    s = re.sub(r"\s+", "-", s)
-    s = re.sub(r"-{2,}", "-", s)
+    s = s.lower().translate(_SLUG_DROP)
+    if not s.isascii():
+        s = _SLUG_NOWORD.sub("", s)
+    s = "-".join(s.split())
+    s = _SLUG_DASH.sub("-", s)
     return s.strip("-")
 
+# Hasil cek DNS di-cache 5 menit: tiap refresh tidak mengulang lookup
+# blocking untuk host yang sama (termasuk retry beruntun).
+_DNS_TTL = 300
+_DNS_CACHE: Dict[str, tuple] = {}  # host -> (ok, ts)
+
 def _dns_ok(host: str) -> bool:
+    hit = _DNS_CACHE.get(host)
+    if hit and time.time() - hit[1] < _DNS_TTL:
+        return hit[0]
     try:
-        socket.getaddrinfo(host, 443)
-        return True
+        socket.getaddrinfo(host, 443, proto=socket.IPPROTO_TCP)
+        ok = True
     except Exception:
-        return False
+        ok = False
+    _DNS_CACHE[host] = (ok, time.time())
+    return ok
+
+# selectolax opsional: parser Lexbor (C, HTML5) jauh lebih ringan dari
+# BS4 untuk halaman listing besar. Shim di bawah menyamakan lima operasi
+# yang dipakai scraper (css/css_first/teks/atribut/parent) supaya kode
+# scraper tetap satu versi dan otomatis jatuh ke BS4+lxml bila
+# selectolax tidak terpasang.
+try:
+    from selectolax.lexbor import LexborHTMLParser
 
-# ===================== Scrapers (4 sumber) =====================
-def scrape_airdrops_io(max_pages: int = 1) -> List[Airdrop]:
-    base = "https://airdrops.io"
-    urls = [f"{base}/latest/"]
-    if max_pages >= 2:
-        urls.append(f"{base}/upcoming/")
+    def _parse_html(html: str):
+        return LexborHTMLParser(html)
 
-    out: List[Airdrop] = []
-    for url in urls:
-        r = requests.get(url, headers=UA, timeout=30); r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        for card in soup.select(".airdrops-list .item, article, .card"):
-            title_el = card.select_one(".title, h3, h2, a[title]") or card.select_one("a")
-            name = _clean_text(title_el.get_text(" ", strip=True) if title_el else "")
-            if not name: 
-                continue
-            a = card.select_one("a")
-            href = a["href"] if (a and a.has_attr("href")) else url
-            full_url = urljoin(base, href)
-            reward_el = card.select_one(".reward, .prize, .subtitle, .reward-amount")
-            chain_el  = card.select_one(".chain, .platform, .network")
-            reward = _clean_text(reward_el.get_text() if reward_el else "")
-            chain  = _clean_text(chain_el.get_text()  if chain_el  else "")
-            slug = _slugify(name)
-            out.append(Airdrop(slug=slug, name=name, chain=chain, reward=reward,
-                               url=full_url, source="airdrops.io"))
-    return out
+    def _css(node, sel: str):
+        return node.css(sel)
 
-def scrape_airdropking(max_pages: int = 1) -> List[Airdrop]:
-    host = "airdropking.io"
-    if not _dns_ok(host):
-        raise RuntimeError("DNS airdropking.io tidak resolve, skip.")
-    base = f"https://{host}"
-    urls = [f"{base}/airdrops/"]
-    out: List[Airdrop] = []
-    for url in urls[:max_pages]:
-        r = requests.get(url, headers=UA, timeout=30); r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        for row in soup.select("article, .airdrop-card, .card"):
-            title_el = row.select_one("h2, h3, .title, a[title]") or row.select_one("a")
-            name = _clean_text(title_el.get_text(" ", strip=True) if title_el else "")
-            if not name: 
-                continue
-            a = row.select_one("a")
-            href = a["href"] if (a and a.has_attr("href")) else url
-            full_url = urljoin(base, href)
-            reward_el = row.select_one(".reward, .rewards, .badge, .prize")
-            chain_el  = row.select_one(".chain, .network, .platform")
-            reward = _clean_text(reward_el.get_text() if reward_el else "")
-            chain  = _clean_text(chain_el.get_text()  if chain_el  else "")
-            slug = _slugify(name)
-            out.append(Airdrop(slug=slug, name=name, chain=chain, reward=reward,
-                               url=full_url, source="airdropking.io"))
-    return out
+    def _css1(node, sel: str):
+        return node.css_first(sel)
 
-def scrape_cryptorank(max_pages: int = 1) -> List[Airdrop]:
-    host = "cryptorank.io"
-    if not _dns_ok(host):
-        raise RuntimeError("DNS cryptorank.io tidak resolve, skip.")
-    base = f"https://{host}"
-    urls = [f"{base}/drophunting"]
-    out: List[Airdrop] = []
-    for url in urls[:max_pages]:
-        r = requests.get(url, headers=UA, timeout=30); r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        rows = soup.select("a[href*='/ico/'], a[href*='/airdrops/'], a[href*='/project/']")
-        seen_links = set()
-        for a in rows:
-            href = a.get("href", ""); 
-            if not href: 
-                continue
-            full = urljoin(base, href)
-            if full in seen_links: 
-                continue
-            seen_links.add(full)
-            name_el = a.select_one("h3, h2, .name, .title") or a
-            name = _clean_text(name_el.get_text(" ", strip=True)) if name_el else ""
-            if not name or len(name) < 2:
-                continue
-            wrap_txt = _clean_text(a.get_text(" ", strip=True))
-            reward = ""
-            m_reward = re.search(r"(reward|value|worth)\s*[:\-]?\s*([^\|]{3,60})", wrap_txt, re.I)
-            if m_reward:
-                reward = _clean_text(m_reward.group(2))
-            chain = ""
-            m_chain = re.search(r"\b(ETH|Ethereum|BSC|BNB|Solana|SOL|Polygon|Base|Arbitrum|Optimism|Aptos|Sui|Linea|zkSync|Starknet|TON|Tron|AVAX)\b", wrap_txt, re.I)
-            chain = m_chain.group(0) if m_chain else ""
-            slug = _slugify(name)
-            out.append(Airdrop(slug=slug, name=name, reward=reward, chain=chain,
-                               url=full, source="cryptorank.io"))
-    return out
+    def _node_text(node) -> str:
+        return node.text(separator=" ", strip=True) if node is not None else ""
+
+    def _attr(node, name: str) -> Optional[str]:
+        return node.attributes.get(name) if node is not None else None
+
+    def _find_parent(node, tags):
+        cur = node.parent
+        while cur is not None and cur.tag not in tags:
+            cur = cur.parent
+        return cur if cur is not None else node
+except Exception:
+    def _parse_html(html: str):
+        return BeautifulSoup(html, "lxml")
+
+    def _css(node, sel: str):
+        return node.select(sel)
 
-def scrape_coingecko_airdrops(max_pages: int = 1) -> List[Airdrop]:
-    host = "www.coingecko.com"
-    if not _dns_ok(host):
-        raise RuntimeError("DNS coingecko.com tidak resolve, skip.")
-    base = f"https://{host}"
-    urls = [f"{base}/airdrops"]
+    def _css1(node, sel: str):
+        return node.select_one(sel)
+
+    def _node_text(node) -> str:
+        return node.get_text(" ", strip=True) if node is not None else ""
+
+    def _attr(node, name: str) -> Optional[str]:
+        return node.get(name) if node is not None else None
+
+    def _find_parent(node, tags):
+        return node.find_parent(list(tags)) or node
+
+# ===================== Scrapers (4 sumber) =====================
+# Pola reward/chain dikompilasi sekali di module level, bukan per kartu
+# di dalam loop scraper.
+_REWARD_RE = re.compile(r"(reward|value|worth)\s*[:\-]?\s*([^\|]{3,60})", re.I)
+_CHAIN_RE = re.compile(
+    r"\b(ETH|Ethereum|BSC|BNB|Solana|SOL|Polygon|Base|Arbitrum|Optimism"
+    r"|Aptos|Sui|Linea|zkSync|Starknet|TON|Tron|AVAX)\b", re.I)
+
+# Keempat sumber 80% identik (fetch -> parse -> loop kartu -> Airdrop);
+# perbedaannya murni data: selector, base URL, dan cara ambil reward/chain.
+# Satu fungsi generik + tabel _SourceCfg, jadi optimasi parser/fetch cukup
+# diterapkan sekali.
+@dataclass(slots=True, frozen=True)
+class _SourceCfg:
+    source: str
+    base: str
+    urls: tuple
+    card_sel: str
+    title_sel: str
+    host: str = ""          # cek DNS dulu bila diisi
+    reward_sel: str = ""    # kosong => reward/chain dari regex teks konteks
+    chain_sel: str = ""
+    link_mode: bool = False   # kartu = anchor itu sendiri, dedup per href
+    parent_ctx: bool = False  # teks konteks dari parent tr/li/div
+    min_name: int = 1
+
+_SOURCES = (
+    _SourceCfg(
+        source="airdrops.io", base="https://airdrops.io",
+        urls=("https://airdrops.io/latest/", "https://airdrops.io/upcoming/"),
+        card_sel=".airdrops-list .item, article, .card",
+        title_sel=".title, h3, h2, a[title]",
+        reward_sel=".reward, .prize, .subtitle, .reward-amount",
+        chain_sel=".chain, .platform, .network",
+    ),
+    _SourceCfg(
+        source="airdropking.io", host="airdropking.io",
+        base="https://airdropking.io",
+        urls=("https://airdropking.io/airdrops/",),
+        card_sel="article, .airdrop-card, .card",
+        title_sel="h2, h3, .title, a[title]",
+        reward_sel=".reward, .rewards, .badge, .prize",
+        chain_sel=".chain, .network, .platform",
+    ),
+    _SourceCfg(
+        source="cryptorank.io", host="cryptorank.io",
+        base="https://cryptorank.io",
+        urls=("https://cryptorank.io/drophunting",),
+        card_sel="a[href*='/ico/'], a[href*='/airdrops/'], a[href*='/project/']",
+        title_sel="h3, h2, .name, .title",
+        link_mode=True, min_name=2,
+    ),
+    _SourceCfg(
+        source="coingecko", host="www.coingecko.com",
+        base="https://www.coingecko.com",
+        urls=("https://www.coingecko.com/airdrops",),
+        card_sel="a[href*='/airdrops/'], tr a[href*='/coins/'], .tw-card a",
+        title_sel="h3, h2, .font-bold, .tw-text, .tw-truncate",
+        link_mode=True, parent_ctx=True, min_name=2,
+    ),
+)
+
+def _scrape_source(cfg: _SourceCfg, max_pages: int = 1) -> List[Airdrop]:
+    if cfg.host and not _dns_ok(cfg.host):
+        raise RuntimeError(f"DNS {cfg.host} tidak resolve, skip.")
     out: List[Airdrop] = []
-    for url in urls[:max_pages]:
-        r = requests.get(url, headers=UA, timeout=30); r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        cards = soup.select("a[href*='/airdrops/'], tr a[href*='/coins/'], .tw-card a")
-        seen = set()
-        for a in cards:
-            href = a.get("href", "")
-            if not href: 
+    seen = set()
+    for url in cfg.urls[:max_pages]:
+        tree = _parse_html(fetch_html(url))
+        for card in _css(tree, cfg.card_sel):
+            if cfg.link_mode:
+                href = _attr(card, "href") or ""
+                if not href:
+                    continue
+                full = urljoin(cfg.base, href)
+                if full in seen:
+                    continue
+                seen.add(full)
+            else:
+                full = urljoin(cfg.base, _attr(_css1(card, "a"), "href") or url)
+            title_el = _css1(card, cfg.title_sel) or (card if cfg.link_mode else _css1(card, "a"))
+            name = _clean_text(_node_text(title_el))
+            if len(name) < cfg.min_name:
                 continue
-            full = urljoin(base, href)
-            if full in seen: 
-                continue
-            seen.add(full)
-            name_el = a.select_one("h3, h2, .font-bold, .tw-text, .tw-truncate") or a
-            name = _clean_text(name_el.get_text(" ", strip=True)) if name_el else ""
-            if not name or len(name) < 2:
-                continue
-            parent = a.find_parent(["tr","li","div"]) or a
-            ptxt = _clean_text(parent.get_text(" ", strip=True))
-            reward = ""
-            chain  = ""
-            m = re.search(r"(reward|worth|value)\s*[:\-]?\s*([^\|]{3,60})", ptxt, re.I)
-            if m:
-                reward = _clean_text(m.group(2))
-            m2 = re.search(r"\b(ETH|Ethereum|BSC|BNB|Solana|SOL|Polygon|Base|Arbitrum|Optimism|Aptos|Sui|Linea|zkSync|Starknet|TON|Tron|AVAX)\b", ptxt, re.I)
-            chain = m2.group(0) if m2 else ""
-            slug = _slugify(name)
-            out.append(Airdrop(slug=slug, name=name, reward=reward, chain=chain,
-                               url=full, source="coingecko"))
+            if cfg.reward_sel:
+                reward = _clean_text(_node_text(_css1(card, cfg.reward_sel)))
+                chain = _clean_text(_node_text(_css1(card, cfg.chain_sel)))
+            else:
+                ctx = _find_parent(card, ("tr", "li", "div")) if cfg.parent_ctx else card
+                txt = _clean_text(_node_text(ctx))
+                m = _REWARD_RE.search(txt)
+                reward = _clean_text(m.group(2)) if m else ""
+                m2 = _CHAIN_RE.search(txt)
+                chain = m2.group(0) if m2 else ""
+            out.append(Airdrop(slug=_slugify(name), name=name, chain=chain,
+                               reward=reward, url=full, source=cfg.source))
     return out
 
 # ===================== Aggregator + Dedup =====================
 def scrape_airdrops_sync(max_pages: int = 1) -> List[Airdrop]:
+    # Keempat sumber jalan paralel di thread: total durasi = sumber paling
+    # lambat, bukan jumlah keempatnya. Scraper tetap sync (SESSION +
+    # HOST_SEMS tetap berlaku) karena seluruh fungsi ini sudah dipanggil
+    # lewat asyncio.to_thread dari handler.
     results: List[Airdrop] = []
-    for fn, label in [
-        (scrape_airdrops_io, "airdrops.io"),
-        (scrape_airdropking, "airdropking.io"),
-        (scrape_cryptorank, "cryptorank"),
-        (scrape_coingecko_airdrops, "coingecko"),
-    ]:
-        try:
-            results.extend(fn(max_pages=max_pages))
-        except Exception as e:
-            log.warning("%s gagal: %s", label, e)
-
+    with ThreadPoolExecutor(max_workers=len(_SOURCES)) as ex:
+        futs = {ex.submit(_scrape_source, cfg, max_pages): cfg.source
+                for cfg in _SOURCES}
+        for fut, label in futs.items():
+            try:
+                results.extend(fut.result())
+            except Exception as e:
+                log.warning("%s gagal: %s", label, e)
+
+    # satu probe dict per entri; duplikat melengkapi field kosong in-place
     uniq: Dict[str, Airdrop] = {}
     for a in results:
-        if a.slug not in uniq:
+        cur = uniq.get(a.slug)
+        if cur is None:
             uniq[a.slug] = a
-        else:
-            if (a.reward and not uniq[a.slug].reward) or (a.chain and not uniq[a.slug].chain):
-                uniq[a.slug] = a
+            continue
+        if a.reward and not cur.reward:
+            cur.reward = a.reward
+        if a.chain and not cur.chain:
+            cur.chain = a.chain
 
     final_list = list(uniq.values())
     if not final_list:
@@ -312,15 +628,37 @@ def scrape_airdrops_sync(max_pages: int = 1) -> List[Airdrop]:
     return final_list
 
 # ===================== Enrich detail (tasks + tombol) =====================
+# Cache hasil enrich per URL: 50 user tanya /tugas yang sama dalam sejam
+# cukup 1x fetch + parse. Tasks ikut tersimpan ke airdrops_cache.json
+# lewat save_cache() sehingga tetap hangat setelah restart.
+_DETAIL_TTL = 3600  # detik
+_DETAIL_CACHE_MAX = 256
+_detail_cache: "OrderedDict[str, tuple]" = OrderedDict()  # url -> (ts, tasks, buttons)
+
+def enrich_airdrop_cached(a: Airdrop) -> Airdrop:
+    now = time.time()
+    hit = _detail_cache.get(a.url)
+    if hit and now - hit[0] < _DETAIL_TTL:
+        _detail_cache.move_to_end(a.url)
+        _, tasks, buttons = hit
+        if tasks:
+            a.tasks = tasks
+        _AIR_BUTTONS[a.slug] = buttons
+        return a
+    a = enrich_airdrop_details(a)
+    _detail_cache[a.url] = (now, list(a.tasks), _AIR_BUTTONS.get(a.slug, []))
+    if len(_detail_cache) > _DETAIL_CACHE_MAX:
+        _detail_cache.popitem(last=False)
+    return a
+
 def enrich_airdrop_details(a: Airdrop) -> Airdrop:
     try:
-        r = requests.get(a.url, headers=UA, timeout=30); r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
+        tree = _parse_html(fetch_html(a.url))
 
         tasks: List[str] = []
         for sel in ["article li", ".content li", ".single-post li", ".steps li", ".howto li", "li"]:
-            for li in soup.select(sel):
-                txt = _clean_text(li.get_text(" ", strip=True))
+            for li in _css(tree, sel):
+                txt = _clean_text(_node_text(li))
                 if txt and 5 <= len(txt) <= 180:
                     tasks.append(txt)
             if tasks:
@@ -331,8 +669,8 @@ def enrich_airdrop_details(a: Airdrop) -> Airdrop:
             if href and href.startswith("http"):
                 buttons.append(InlineKeyboardButton(label, url=href))
 
-        for a_tag in soup.select("a[href]"):
-            href = a_tag["href"].strip()
+        for a_tag in _css(tree, "a[href]"):
+            href = (_attr(a_tag, "href") or "").strip()
             low  = href.lower()
             if "t.me/" in low:
                 add_btn("📨 Telegram", href)
@@ -351,16 +689,26 @@ def enrich_airdrop_details(a: Airdrop) -> Airdrop:
 
         if tasks:
             a.tasks = tasks[:12]
-        setattr(a, "_buttons", buttons[:6])
+        _AIR_BUTTONS[a.slug] = buttons[:6]
     except Exception as e:
         log.warning("enrich_airdrop_details gagal untuk %s: %s", a.url, e)
     return a
 
 # ===================== Cache helpers =====================
 def save_cache():
+    # tulis ke file temp lalu os.replace: atomic, cache tidak pernah korup
+    # walau proses mati di tengah tulis.
     try:
-        with open(AIR_CACHE, "w", encoding="utf-8") as f:
-            json.dump([asdict(a) for a in AIRDROPS], f, ensure_ascii=False, indent=2)
+        tmp = AIR_CACHE + ".tmp"
+        if orjson is not None:
+            # orjson serialize dataclass native: tanpa asdict() per objek
+            payload = orjson.dumps(list(AIRDROPS), option=orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps([asdict(a) for a in AIRDROPS],
+                                 ensure_ascii=False, indent=2).encode("utf-8")
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, AIR_CACHE)
     except Exception as e:
         log.warning("save_cache gagal: %s", e)
 
@@ -368,10 +716,9 @@ def load_cache():
     try:
         p = pathlib.Path(AIR_CACHE)
         if p.exists():
-            data = json.load(open(p, "r", encoding="utf-8"))
-            AIRDROPS.clear()
-            for d in data:
-                AIRDROPS.append(Airdrop(**d))
+            raw = p.read_bytes()
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            set_airdrops([Airdrop(**d) for d in data])
             log.info("Cache dimuat: %d airdrops", len(AIRDROPS))
     except Exception as e:
         log.warning("load_cache gagal: %s", e)
@@ -381,6 +728,10 @@ def _paged(items: List[Airdrop], page: int, per_page: int = 5) -> List[Airdrop]:
     start = (page - 1) * per_page
     return items[start:start + per_page]
 
+# Keyboard refresh-only statis: kasus daftar satu halaman, dipakai ulang.
+_REFRESH_KB = InlineKeyboardMarkup(
+    [[InlineKeyboardButton("🔄 Refresh", callback_data="air_refresh:1")]])
+
 def _air_kb(page: int, total: int, per_page: int = 5):
     btns = []
     if page > 1:
@@ -388,24 +739,26 @@ def _air_kb(page: int, total: int, per_page: int = 5):
     if page * per_page < total:
         btns.append(InlineKeyboardButton("Next ➡️", callback_data=f"air_next:{page+1}"))
     if not btns:
-        btns = [InlineKeyboardButton("🔄 Refresh", callback_data="air_refresh:1")]
+        return _REFRESH_KB
     return InlineKeyboardMarkup([btns])
 
 # ===================== Commands: start/help =====================
+# Markup menu statis: dibangun sekali saat import, bukan per /start.
+MAIN_MENU = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💰 Harga", callback_data="menu_price"),
+     InlineKeyboardButton("🔁 Convert", callback_data="menu_conv")],
+    [InlineKeyboardButton("🎁 Airdrop", callback_data="menu_air"),
+     InlineKeyboardButton("🤖 AI", callback_data="menu_ai")],
+])
+
 async def start(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
-    kb = [
-        [InlineKeyboardButton("💰 Harga", callback_data="menu_price"),
-         InlineKeyboardButton("🔁 Convert", callback_data="menu_conv")],
-        [InlineKeyboardButton("🎁 Airdrop", callback_data="menu_air"),
-         InlineKeyboardButton("🤖 AI", callback_data="menu_ai")],
-    ]
     await update.message.reply_text(
         "Selamat datang di AirdropCore Bot!\n\n"
         "• Ketik bebas: `btc usd`, `0.25 eth idr`\n"
         "• /price <coin> [fiat]\n• /prices btc,eth idr\n• /convert 123 sol usd\n"
         "• /setfiat idr|usd|usdt|eur\n"
         "• /airupdate, /airdrops, /tugas <keyword>, /airstatus\n",
-        reply_markup=InlineKeyboardMarkup(kb),
+        reply_markup=MAIN_MENU,
         parse_mode="Markdown",
     )
 
@@ -428,6 +781,102 @@ async def setfiat_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     set_chat_fiat(chat_id, fiat)
     await update.message.reply_text(f"✅ FIAT diset ke {fiat.upper()}")
 
+# Coalesce prompt identik: jawaban di-cache 60 detik dan duplikat yang
+# sedang in-flight menunggu Future yang sama, bukan buka call OpenAI baru.
+_AI_ANSWER_TTL = 60
+_AI_ANSWERS_MAX = 256
+_AI_ANSWERS: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (ts, answer)
+_AI_INFLIGHT: Dict[str, asyncio.Future] = {}
+
+# Batasi input ke model: prompt dipotong supaya TPM per request terprediksi;
+# system prompt pendek menekan jumlah token output untuk chat bebas.
+_AI_PROMPT_MAX_CHARS = 1500
+_AI_SYSTEM_SHORT = "Jawab ringkas dalam bahasa Indonesia, maksimal 3 kalimat."
+
+def _ai_prompt_key(prompt: str) -> str:
+    return hashlib.blake2b(prompt.strip().lower().encode("utf-8"),
+                           digest_size=16).hexdigest()
+
+async def _stream_ai_reply(update: Update, prompt: str,
+                           max_tokens: int = 400, temperature: float = 0.5,
+                           system: Optional[str] = None) -> None:
+    """Stream jawaban AI: kirim placeholder lalu edit berkala (debounce 0.4s)
+    supaya user lihat output dalam <1s, bukan menunggu generasi penuh."""
+    prompt = prompt[:_AI_PROMPT_MAX_CHARS]
+    key = _ai_prompt_key((system or "") + "\n" + prompt)
+    hit = _AI_ANSWERS.get(key)
+    if hit and time.time() - hit[0] < _AI_ANSWER_TTL:
+        await update.message.reply_text(hit[1])
+        return
+    inflight = _AI_INFLIGHT.get(key)
+    if inflight is not None:
+        await update.message.reply_text(await inflight)
+        return
+    fut: asyncio.Future = asyncio.get_running_loop().create_future()
+    _AI_INFLIGHT[key] = fut
+    try:
+        answer = await _stream_ai_once(update, prompt, max_tokens, temperature, system)
+        # buang entri kedaluwarsa sekalian + batasi ukuran (FIFO) supaya
+        # cache jawaban tidak tumbuh tanpa batas seperti cache tetangga
+        now = time.time()
+        for k in [k for k, v in _AI_ANSWERS.items() if now - v[0] >= _AI_ANSWER_TTL]:
+            _AI_ANSWERS.pop(k, None)
+        while len(_AI_ANSWERS) >= _AI_ANSWERS_MAX:
+            _AI_ANSWERS.popitem(last=False)
+        _AI_ANSWERS[key] = (now, answer)
+        fut.set_result(answer)
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # tandai sudah diambil bila tak ada penunggu
+        raise
+    finally:
+        _AI_INFLIGHT.pop(key, None)
+
+async def _stream_ai_once(update: Update, prompt: str,
+                          max_tokens: int, temperature: float,
+                          system: Optional[str] = None) -> str:
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    msg = await update.message.reply_text("…")
+    buf = ""
+    last_edit = time.monotonic()
+    async with get_chat_lock(update.effective_chat.id), OPENAI_SEM:
+        for attempt in range(3):
+            await ai_limiter_acquire()
+            try:
+                # wait_for membatasi waktu tunggu sampai stream mulai (TTFB OpenAI)
+                stream = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=messages,
+                        max_tokens=max_tokens, temperature=temperature,
+                        stream=True,
+                    ),
+                    timeout=20,
+                )
+                break
+            except RateLimitError:
+                if attempt == 2:
+                    raise
+                await asyncio.sleep(min(2 ** attempt, 15))
+        async for chunk in stream:
+            buf += chunk.choices[0].delta.content or ""
+            now = time.monotonic()
+            if buf.strip() and now - last_edit > 0.4:
+                last_edit = now
+                try:
+                    await msg.edit_text(buf)
+                except BadRequest:
+                    pass
+    final = buf.strip() or "❌ AI tidak memberi jawaban."
+    try:
+        await msg.edit_text(final)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
+    return final
+
 async def ask_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     if not client:
         await update.message.reply_text("❌ Fitur AI belum aktif (OPENAI_API_KEY kosong).")
@@ -437,24 +886,20 @@ async def ask_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Format: /ask <pertanyaan>")
         return
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role":"user","content": prompt}],
-            max_tokens=400, temperature=0.5
-        )
-        answer = resp.choices[0].message.content.strip()
-        await update.message.reply_text(answer)
+        await _stream_ai_reply(update, prompt, max_tokens=400, temperature=0.5)
+    except asyncio.TimeoutError:
+        await update.message.reply_text("⏳ AI kelamaan merespons, coba lagi sebentar.")
     except Exception as e:
         log.exception("AI error")
         await update.message.reply_text(f"❌ Error AI: {e}")
 
 # ===================== Commands: Harga/Convert =====================
 async def reply_price(update: Update, sym: str, fiat: str):
-    cid = resolve_coin_id(sym)
+    cid = await resolve_coin_id(sym)
     if not cid:
         await update.message.reply_text(f"❌ {sym.upper()} tidak ditemukan.")
         return
-    data = fetch_price([cid], fiat)
+    data = await batched_fetch_price(cid, fiat)
     if cid not in data or fiat not in data[cid]:
         await update.message.reply_text(f"❌ Pair {sym.upper()}-{fiat.upper()} tidak tersedia.")
         return
@@ -479,15 +924,16 @@ async def prices_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
         return
     coins = [c.strip() for c in ctx.args[0].split(",") if c.strip()]
     fiat = (ctx.args[1] if len(ctx.args) > 1 else get_chat_fiat(chat_id)).lower()
+    # resolve paralel: N simbol tak dikenal = 1x latency /search, bukan N
+    cids = await asyncio.gather(*(resolve_coin_id(c) for c in coins))
     ids = []; name_map = {}
-    for c in coins:
-        cid = resolve_coin_id(c)
+    for c, cid in zip(coins, cids):
         if cid:
             ids.append(cid); name_map[cid] = c.upper()
     if not ids:
         await update.message.reply_text("❌ Coin tidak ditemukan.")
         return
-    data = fetch_price(ids, fiat)
+    data = await fetch_price(ids, fiat)
     lines = []
     for cid in ids:
         if cid in data and fiat in data[cid]:
@@ -504,16 +950,16 @@ async def convert_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
         return
     try:
         amount = float(ctx.args[0])
-    except Exception:
+    except ValueError:
         await update.message.reply_text("❌ amount harus angka. Contoh: /convert 0.25 btc idr")
         return
     sym    = ctx.args[1]
     fiat   = ctx.args[2].lower() if len(ctx.args) >= 3 else get_chat_fiat(chat_id)
-    cid = resolve_coin_id(sym)
+    cid = await resolve_coin_id(sym)
     if not cid:
         await update.message.reply_text("❌ Coin tidak ditemukan.")
         return
-    data = fetch_price([cid], fiat)
+    data = await batched_fetch_price(cid, fiat)
     if cid not in data or fiat not in data[cid]:
         await update.message.reply_text("❌ Pair tidak tersedia.")
         return
@@ -523,25 +969,52 @@ async def convert_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     chg_txt = f" (24h: {chg:+.2f}%)" if isinstance(chg,(int,float)) else ""
     await update.message.reply_text(f"{amount:g} {sym.upper()} ≈ {fmt_price(total, fiat)}{chg_txt}")
     # ===================== Commands: Airdrop =====================
+# Satu scrape manual berjalan pada satu waktu; /airupdate susulan ditolak.
+_AIRUPDATE_LOCK = asyncio.Lock()
+
 async def airupdate_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    if _AIRUPDATE_LOCK.locked():
+        await update.message.reply_text("⏳ Update sedang berjalan, tunggu sebentar…")
+        return
     await update.message.reply_text("🔄 Sedang update daftar airdrops…")
-    loop = asyncio.get_running_loop()
+    # fire-and-forget lewat create_task PTB agar ikut graceful shutdown;
+    # handler selesai seketika, pesan "selesai" dikirim dari task.
+    ctx.application.create_task(_do_airupdate(update), update=update)
+
+async def _do_airupdate(update: Update) -> None:
     try:
-        new_list = await loop.run_in_executor(None, scrape_airdrops_sync, 1)
-        AIRDROPS.clear()
-        AIRDROPS.extend(new_list)
-        global LAST_AIR_UPDATE
-        LAST_AIR_UPDATE = datetime.utcnow()
-        save_cache()
+        async with _AIRUPDATE_LOCK:
+            new_list = await asyncio.to_thread(scrape_airdrops_sync, 1)
+            set_airdrops(new_list)
+            global LAST_AIR_UPDATE
+            LAST_AIR_UPDATE = datetime.utcnow()
+            await asyncio.to_thread(save_cache)
         await update.message.reply_text(f"✅ Scraper selesai. Terkumpul {len(AIRDROPS)} airdrop.\nKetik /airdrops untuk melihat daftar.")
     except Exception as e:
         await update.message.reply_text(f"❌ Gagal update: {e}")
 
+# Escape konten hasil scrape sekali jalan via str.translate (O(n), satu
+# alokasi) sebelum diinterpolasi ke pesan parse_mode=HTML.
+_HTML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
 def _air_list_text(items: List[Airdrop]) -> str:
-    lines = ["📋 Airdrop terdeteksi:\n"]
-    for a in items:
-        lines.append(f"• <b>{a.name}</b> — {a.reward or '-'} ({a.chain or '-'})\n  {a.url}")
-    return "\n".join(lines)
+    # satu join atas generator: buffer hasil dialokasikan sekali, tanpa
+    # list perantara + append per baris
+    return "📋 Airdrop terdeteksi:\n\n" + "\n".join(
+        f"• <b>{a.name.translate(_HTML_ESCAPE)}</b> — "
+        f"{(a.reward or '-').translate(_HTML_ESCAPE)} "
+        f"({(a.chain or '-').translate(_HTML_ESCAPE)})\n  {a.url}"
+        for a in items)
+
+# Halaman yang sudah dirender di-cache sampai daftar airdrop berganti
+# (set_airdrops), jadi /airdrops & klik paginasi tidak memformat ulang.
+_PAGE_CACHE: Dict[int, str] = {}
+
+def _render_air_page(page: int, per_page: int = 5) -> str:
+    txt = _PAGE_CACHE.get(page)
+    if txt is None:
+        txt = _PAGE_CACHE[page] = _air_list_text(_paged(AIRDROPS, page, per_page))
+    return txt
 
 async def airdrops_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     if not AIRDROPS:
@@ -549,8 +1022,7 @@ async def airdrops_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
         return
     page = 1
     per_page = 5
-    chunk = _paged(AIRDROPS, page, per_page)
-    txt = _air_list_text(chunk)
+    txt = _render_air_page(page, per_page)
     await update.message.reply_html(txt, reply_markup=_air_kb(page, len(AIRDROPS), per_page))
 
 async def tugas_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
@@ -558,28 +1030,74 @@ async def tugas_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Format: /tugas <keyword>\nContoh: /tugas monad")
         return
     key = " ".join(ctx.args).lower()
-    found = [a for a in AIRDROPS if key in a.slug or key in a.name.lower()]
+    grams = _trigrams(key)
+    if grams and AIR_TRIGRAMS:
+        # irisan posting list trigram menyisakan segelintir kandidat;
+        # verifikasi substring hanya jalan di sisa itu.
+        idxs: Optional[set] = None
+        for g in grams:
+            post = AIR_TRIGRAMS.get(g)
+            if not post:
+                idxs = set()
+                break
+            idxs = set(post) if idxs is None else (idxs & post)
+            if not idxs:
+                break
+        found = [AIRDROPS[i] for i in sorted(idxs or ())
+                 if key in AIRDROPS[i].slug or key in AIR_NAME_LOWER[i]]
+    else:
+        # key < 3 huruf: trigram tidak terbentuk, pakai scan biasa
+        found = [a for a, nl in zip(AIRDROPS, AIR_NAME_LOWER)
+                 if key in a.slug or key in nl]
     if not found:
-        await update.message.reply_text(f"❌ Tidak ditemukan untuk '{key}'.")
-        return
-    a = enrich_airdrop_details(found[0])  # ambil detail saat diminta
+        fz = fuzzy_find(key)
+        if not fz:
+            await update.message.reply_text(f"❌ Tidak ditemukan untuk '{key}'.")
+            return
+        found = [fz]
+    async with get_chat_lock(update.effective_chat.id):
+        # ambil detail saat diminta; parsing BS4 sync, jangan blokir event loop
+        a = await asyncio.to_thread(enrich_airdrop_cached, found[0])
     tasks = a.tasks or ["Join Telegram", "Follow X", "Claim in app"]
-    task_txt = "\n".join([f"• {t}" for t in tasks])
+    task_txt = "\n".join("• " + t.translate(_HTML_ESCAPE) for t in tasks)
     kb = None
-    btns = getattr(a, "_buttons", None)
+    btns = _AIR_BUTTONS.get(a.slug)
     if btns:
         rows = [btns[i:i+2] for i in range(0, len(btns), 2)]
         kb = InlineKeyboardMarkup(rows)
     await update.message.reply_html(
-        f"🎁 <b>{a.name}</b>\n"
-        f"Reward: {a.reward or '-'}\n"
-        f"Chain: {a.chain or '-'}\n"
-        f"Sumber: {a.source}\n"
+        f"🎁 <b>{a.name.translate(_HTML_ESCAPE)}</b>\n"
+        f"Reward: {(a.reward or '-').translate(_HTML_ESCAPE)}\n"
+        f"Chain: {(a.chain or '-').translate(_HTML_ESCAPE)}\n"
+        f"Sumber: {a.source.translate(_HTML_ESCAPE)}\n"
         f"URL: {a.url}\n\n"
         f"<b>Tugas:</b>\n{task_txt}",
         reply_markup=kb
     )
 
+# Dedup edit: simpan signature teks terakhir per pesan, skip edit yang identik
+# (klik Next→Prev→Next cepat memicu "Message is not modified" + buang kuota).
+_EDIT_SIGS: "OrderedDict[tuple, bytes]" = OrderedDict()
+_EDIT_SIGS_MAX = 10_000
+
+def _edit_changed(chat_id: int, message_id: int, text: str) -> bool:
+    key = (chat_id, message_id)
+    sig = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    if _EDIT_SIGS.get(key) == sig:
+        _EDIT_SIGS.move_to_end(key)
+        return False
+    _EDIT_SIGS[key] = sig
+    _EDIT_SIGS.move_to_end(key)
+    if len(_EDIT_SIGS) > _EDIT_SIGS_MAX:
+        _EDIT_SIGS.popitem(last=False)
+    return True
+
+def _edit_forget(chat_id: int, message_id: int) -> None:
+    # Edit gagal terkirim (timeout/rate limit): buang signature supaya
+    # klik berikutnya ke teks yang sama tidak dianggap duplikat dan
+    # pesan tidak tersangkut di halaman lama.
+    _EDIT_SIGS.pop((chat_id, message_id), None)
+
 async def air_cb(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query; await q.answer()
     data = q.data or ""
@@ -592,21 +1110,29 @@ async def air_cb(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
         if not AIRDROPS:
             await q.edit_message_text("⚠️ Belum ada data. Kirim /airupdate untuk mengisi daftar.")
             return
-        chunk = _paged(AIRDROPS, page, per_page)
-        txt = _air_list_text(chunk)
-        await q.edit_message_text(text=txt, reply_markup=_air_kb(page, len(AIRDROPS), per_page), parse_mode="HTML")
-        
+        txt = _render_air_page(page, per_page)
+        if not _edit_changed(q.message.chat_id, q.message.message_id, txt):
+            return
+        try:
+            await q.edit_message_text(text=txt, reply_markup=_air_kb(page, len(AIRDROPS), per_page), parse_mode="HTML")
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return
+            _edit_forget(q.message.chat_id, q.message.message_id)
+            raise
+        except Exception:
+            _edit_forget(q.message.chat_id, q.message.message_id)
+            raise
+
 # ===================== Auto-refresh (JobQueue) =====================
 async def job_airupdate(context):
     """Auto-refresh daftar airdrop berkala."""
-    loop = asyncio.get_running_loop()
     try:
-        new_list = await loop.run_in_executor(None, scrape_airdrops_sync, 1)
-        AIRDROPS.clear()
-        AIRDROPS.extend(new_list)
+        new_list = await asyncio.to_thread(scrape_airdrops_sync, 1)
+        set_airdrops(new_list)
         global LAST_AIR_UPDATE
         LAST_AIR_UPDATE = datetime.utcnow()
-        save_cache()
+        await asyncio.to_thread(save_cache)
         log.info("Auto-refresh OK: %d airdrops", len(AIRDROPS))
     except Exception as e:
         log.warning("Auto-refresh gagal: %s", e)
@@ -623,63 +1149,83 @@ async def airstatus_cmd(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     )
 
 # ===================== Menu & Text Router =====================
+# Teks menu statis: dibangun sekali, bukan per callback.
+MENU_TEXTS = {
+    "menu_price": ("Contoh:\n• /price btc usdt\n• btc usd\n• 0.25 eth idr\n"
+                   "• /prices btc,eth idr\n• /convert 2 sol usd"),
+    "menu_conv": ("Convert:\n• /convert <amount> <coin> <fiat>\n"
+                  "• Contoh: /convert 0.1 btc idr"),
+    "menu_air": ("Airdrop:\n• /airupdate (update daftar)\n"
+                 "• /airdrops (daftar + tombol Next/Prev)\n"
+                 "• /tugas <keyword> (detail + tombol link)\n"
+                 "• /airstatus (status cache & jadwal)"),
+    "menu_ai": "AI Chat: /ask <pertanyaan>",
+}
+
 async def on_menu_cb(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query; data = q.data or ""; await q.answer()
-    if data == "menu_price":
-        txt = ("Contoh:\n• /price btc usdt\n• btc usd\n• 0.25 eth idr\n"
-               "• /prices btc,eth idr\n• /convert 2 sol usd")
-    elif data == "menu_conv":
-        txt = ("Convert:\n• /convert <amount> <coin> <fiat>\n"
-               "• Contoh: /convert 0.1 btc idr")
-    elif data == "menu_air":
-        txt = ("Airdrop:\n• /airupdate (update daftar)\n"
-               "• /airdrops (daftar + tombol Next/Prev)\n"
-               "• /tugas <keyword> (detail + tombol link)\n"
-               "• /airstatus (status cache & jadwal)")
-    elif data == "menu_ai":
-        txt = "AI Chat: /ask <pertanyaan>"
-    else:
-        txt = "Pilih menu di bawah ini."
-    await q.edit_message_text(txt)
+    txt = MENU_TEXTS.get(data, "Pilih menu di bawah ini.")
+    # user menekan tombol yang sama dua kali => konten tidak berubah, skip
+    if not _edit_changed(q.message.chat_id, q.message.message_id, txt):
+        return
+    try:
+        await q.edit_message_text(txt)
+    except BadRequest as e:
+        if "not modified" in str(e).lower():
+            return
+        _edit_forget(q.message.chat_id, q.message.message_id)
+        raise
+    except Exception:
+        _edit_forget(q.message.chat_id, q.message.message_id)
+        raise
 
 async def text_router(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     text = (update.message.text or "").strip()
 
-    # 1) "0.25 eth idr"
-    m = PAIR_PATTERN.match(text)
-    if m:
-        try:
-            amount = float(m.group(1))
-        except Exception:
-            return await update.message.reply_text("Format: 0.25 eth idr")
-        sym = m.group(2); fiat = m.group(3).lower()
-        class DummyArgs(list): pass
-        ctx.args = DummyArgs([str(amount), sym, fiat])
-        return await convert_cmd(update, ctx)
-
-    # 2) "btc usd" atau "eth idr"
-    m = COIN_FIAT_PAT.match(text)
-    if m:
-        sym, fiat = m.groups()
-        return await reply_price(update, sym, fiat.lower())
-
-    # 3) "btc" saja => pakai fiat default chat
-    m = SINGLE_COIN.match(text)
+    m = RX_TEXT.match(text)
     if m:
-        sym = m.group(1)
+        # 1) "0.25 eth idr"
+        if m.group("amt"):
+            try:
+                amount = float(m.group("amt"))
+            except Exception:
+                return await update.message.reply_text("Format: 0.25 eth idr")
+            sym = m.group("amt_sym"); fiat = m.group("amt_fiat").lower()
+            class DummyArgs(list): pass
+            ctx.args = DummyArgs([str(amount), sym, fiat])
+            return await convert_cmd(update, ctx)
+
+        # 2) "btc usd" atau "eth idr"
+        if m.group("p_sym"):
+            return await reply_price(update, m.group("p_sym"), m.group("p_fiat").lower())
+
+        # 3) "btc" saja => pakai fiat default chat
         fiat = get_chat_fiat(update.effective_chat.id)
-        return await reply_price(update, sym, fiat)
-
-    # 4) fallback AI
+        return await reply_price(update, m.group("sym"), fiat)
+
+    # 4) kata kunci "airdrop" => daftar airdrop, tanpa lewat AI.
+    # lower() sekali saja; substring scan-nya C-level (Boyer-Moore-ish).
+    tl = text.lower()
+    if "airdrop" in tl:
+        return await airdrops_cmd(update, ctx)
+
+    # 5) fallback AI — jalur termahal (latency + biaya); saring dulu:
+    # teks sampah pendek ("hi", "?", "ok") tidak perlu LLM, dan satu user
+    # tidak bisa membanjiri AI lebih cepat dari cooldown-nya.
+    if len(text) < 4 or not any(ch.isalpha() for ch in text):
+        return await update.message.reply_text("Ketik /help untuk daftar perintah.")
+    uid = update.effective_user.id if update.effective_user else 0
+    now = time.monotonic()
+    if now - _AI_USER_LAST.get(uid, 0.0) < _AI_USER_COOLDOWN:
+        return await update.message.reply_text("⏳ Pelan-pelan ya, tunggu beberapa detik sebelum tanya AI lagi.")
+    if len(_AI_USER_LAST) >= _AI_USER_LAST_MAX:
+        for k in [k for k, t in _AI_USER_LAST.items() if now - t >= _AI_USER_COOLDOWN]:
+            _AI_USER_LAST.pop(k, None)
+    _AI_USER_LAST[uid] = now
     if client:
         try:
-            resp = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role":"user","content": text}],
-                max_tokens=300, temperature=0.6
-            )
-            answer = resp.choices[0].message.content.strip()
-            await update.message.reply_text(answer)
+            await _stream_ai_reply(update, text, max_tokens=300, temperature=0.3,
+                                   system=_AI_SYSTEM_SHORT)
             return
         except Exception as e:
             log.warning("AI fallback error: %s", e)
@@ -688,7 +1234,21 @@ async def text_router(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     
 # ===================== Runner =====================
 def main():
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        # pool bawaan HTTPXRequest cuma 1 koneksi; dengan 256 update
+        # konkuren semua sendMessage/editMessageText akan antre di situ.
+        .request(HTTPXRequest(connection_pool_size=50,
+                              connect_timeout=10, read_timeout=20))
+        .concurrent_updates(256)
+        # patuhi limit Telegram: 30 msg/s global, 20 msg/menit per group
+        .rate_limiter(AIORateLimiter(overall_max_rate=30, overall_time_period=1,
+                                     group_max_rate=20, group_time_period=60,
+                                     max_retries=1))
+        .post_shutdown(_close_http)
+        .build()
+    )
 
     # load cache dulu
     load_cache()
@@ -715,8 +1275,22 @@ def main():
     # schedule auto-refresh (mulai 10 detik, lalu tiap AIR_REFRESH_HOURS jam)
     app.job_queue.run_repeating(job_airupdate, interval=timedelta(hours=AIR_REFRESH_HOURS), first=10)
 
-    log.info("Bot polling started")
-    app.run_polling(drop_pending_updates=True)
+    if WEBHOOK_URL:
+        # produksi: Telegram push update (tanpa RTT getUpdates) dan bisa
+        # mengirim beberapa update paralel sesuai max_connections
+        log.info("Bot webhook started: %s", WEBHOOK_URL)
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=int(os.getenv("PORT", "8080")),
+            webhook_url=WEBHOOK_URL,
+            max_connections=40,
+            drop_pending_updates=True,
+        )
+    else:
+        log.info("Bot polling started")
+        # timeout 30s = long-poll maksimal: lebih sedikit siklus getUpdates
+        # kosong per menit saat bot sepi
+        app.run_polling(drop_pending_updates=True, timeout=30)
 
 if __name__ == "__main__":
     main()
@@ -10,26 +10,30 @@ def init_openai(api_key: Optional[str] = None):
     if not key:
         return None
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=key)
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(api_key=key)
         logging.info("OpenAI client initialized")
     except Exception as e:
         logging.error("OpenAI init failed: %s", e)
     return client
 
-def chat(prompt: str, model: str = None, temp: float = 0.5, max_tokens: int = 450) -> str:
+# System prompt konstan: satu string interned, tidak dirakit per panggilan.
+_SYSTEM = (
+    "You are AIRA, an expert crypto & airdrop assistant for Telegram users. "
+    "Respond in Indonesian. Singkat, to-the-point, bullet bila cocok. "
+    "Jika bahas trading, beri disclaimer singkat: bukan saran finansial."
+)
+
+# Default 280 token cukup untuk jawaban chat bebas; caller yang butuh
+# jawaban panjang (mis. /ask) set budget-nya sendiri.
+async def chat(prompt: str, model: str = None, temp: float = 0.5, max_tokens: int = 280) -> str:
     if not client:
         return "⚠️ AI nonaktif (OPENAI_API_KEY belum diisi)."
-    system = (
-        "You are AIRA, an expert crypto & airdrop assistant for Telegram users. "
-        "Respond in Indonesian. Singkat, to-the-point, bullet bila cocok. "
-        "Jika bahas trading, beri disclaimer singkat: bukan saran finansial."
-    )
     try:
-        resp = client.chat.completions.create(
+        resp = await client.chat.completions.create(
             model=model or os.getenv("OPENAI_MODEL","gpt-4o-mini"),
             messages=[
-                {"role":"system","content":system},
+                {"role":"system","content":_SYSTEM},
                 {"role":"user","content":prompt}
             ],
             temperature=temp, max_tokens=max_tokens
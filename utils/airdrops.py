@@ -1,24 +1,89 @@
 
-import feedparser
-from typing import List, Tuple
+import io
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
+from typing import Iterator, List, Tuple
 
 AIR_FEEDS = [
     "https://airdrops.io/latest/feed",
     "https://cryptorank.io/airdrops/feed",
 ]
 
-def fetch_airdrops(query: str = "", limit: int = 6) -> List[Tuple[str,str,str]]:
+UA = {"User-Agent": "Mozilla/5.0 (compatible; AirdropCoreBot/2.2)"}
+
+# Satu Session untuk download feed: koneksi TLS per host dipakai ulang
+# antar refresh + retry otomatis untuk 429/5xx (pola sama dengan
+# utils/crypto.py).
+SESSION = requests.Session()
+SESSION.headers.update(UA)
+SESSION.mount("https://", requests.adapters.HTTPAdapter(
+    pool_connections=len(AIR_FEEDS), pool_maxsize=len(AIR_FEEDS) * 2,
+    max_retries=requests.adapters.Retry(
+        total=2, backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504]),
+))
+
+# Feed RSS berubah dalam hitungan menit; simpan bytes mentah per URL
+# selama 120 detik supaya panggilan beruntun tidak download ulang.
+_FEED_TTL = 120
+_FEED_CACHE = {}  # url -> (expiry_monotonic, bytes)
+
+# Validator ETag/Last-Modified per feed: setelah TTL lewat, kirim
+# conditional GET — 304 berarti pakai ulang bytes tersimpan tanpa
+# download body.
+_FEED_COND = {}  # url -> (etag, last_modified, body)
+
+def _get_feed_bytes(url: str) -> bytes:
+    hit = _FEED_CACHE.get(url)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+    headers = {}
+    cond = _FEED_COND.get(url)
+    if cond:
+        if cond[0]:
+            headers["If-None-Match"] = cond[0]
+        if cond[1]:
+            headers["If-Modified-Since"] = cond[1]
+    r = SESSION.get(url, headers=headers, timeout=20)
+    if r.status_code == 304 and cond:
+        body = cond[2]
+    else:
+        r.raise_for_status()
+        body = r.content
+        etag = r.headers.get("ETag")
+        last_mod = r.headers.get("Last-Modified")
+        if etag or last_mod:
+            _FEED_COND[url] = (etag, last_mod, body)
+        else:
+            _FEED_COND.pop(url, None)
+    _FEED_CACHE[url] = (time.monotonic() + _FEED_TTL, body)
+    return body
+
+def _iter_feed_items(body: bytes) -> Iterator[Tuple[str, str, str]]:
+    # Parse streaming: tiap <item> dilepas (clear) begitu selesai dibaca,
+    # jadi memori tetap datar berapapun ukuran feed-nya.
+    for _, el in etree.iterparse(io.BytesIO(body), tag="item", recover=True):
+        title = (el.findtext("title") or "").strip()
+        link = (el.findtext("link") or "").strip()
+        summary = el.findtext("description") or ""
+        el.clear(keep_tail=True)
+        yield title, link, summary
+
+def fetch_airdrops(query: str = "", limit: int = 6) -> List[Tuple[str, str, str]]:
     out = []
-    for url in AIR_FEEDS:
+    q = query.lower()
+    # download kedua feed paralel (latency = feed terlambat, bukan jumlahnya);
+    # parse tetap berurutan supaya prioritas sumber tidak berubah
+    with ThreadPoolExecutor(max_workers=len(AIR_FEEDS)) as ex:
+        futs = [(url, ex.submit(_get_feed_bytes, url)) for url in AIR_FEEDS]
+    for url, fut in futs:
         try:
-            feed = feedparser.parse(url)
-            for e in feed.entries:
-                title = (getattr(e, "title", "") or "").strip()
-                link  = (getattr(e, "link", "") or "").strip()
-                summary = (getattr(e, "summary", "") or "")
+            for title, link, summary in _iter_feed_items(fut.result()):
                 if not title or not link:
                     continue
-                if query and query.lower() not in title.lower():
+                if q and q not in title.lower():
                     continue
                 out.append((title, link, summary))
                 if len(out) >= limit:
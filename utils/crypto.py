@@ -1,7 +1,25 @@
 
+import functools
+import time
 import requests
 from datetime import datetime, timezone
 
+# orjson opsional: decode JSON C-level, fallback parser bawaan response
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+# Satu Session untuk semua call modul ini: koneksi TLS ke CoinGecko
+# dipakai ulang + retry otomatis untuk 429/5xx.
+SESSION = requests.Session()
+SESSION.mount("https://", requests.adapters.HTTPAdapter(
+    pool_connections=8, pool_maxsize=16,
+    max_retries=requests.adapters.Retry(
+        total=2, backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504]),
+))
+
 COINGECKO_SIMPLE = "https://api.coingecko.com/api/v3/simple/price"
 COINGECKO_MARKETS = "https://api.coingecko.com/api/v3/coins/markets"
 COINGECKO_GLOBAL  = "https://api.coingecko.com/api/v3/global"
@@ -16,24 +34,55 @@ SYMBOL_MAP = {
     "near":"near","atom":"cosmos","cake":"pancakeswap-token"
 }
 
+@functools.lru_cache(maxsize=4096)
 def norm_symbol(sym: str) -> str:
-    return SYMBOL_MAP.get(sym.lower().lstrip("$"), sym.lower().lstrip("$"))
+    # lower + strip "$" sekali saja; hasil per simbol di-memoize karena
+    # simbol yang sama ditanya berulang kali lintas perintah.
+    s = sym.lower()
+    if s.startswith("$"):
+        s = s[1:]
+    return SYMBOL_MAP.get(s, s)
+
+# Dispatch table per fiat: tanpa rantai if per panggilan; path IDR pakai
+# translate (satu pass C-level) alih-alih format + replace.
+_IDR_DOTS = str.maketrans(",", ".")
+_FMTS = {
+    "idr": lambda v: f"Rp {v:,.0f}".translate(_IDR_DOTS),
+    "usd": lambda v: f"${v:,.2f}",
+    "usdt": lambda v: f"${v:,.2f}",
+    "eur": lambda v: f"€{v:,.2f}",
+}
 
 def fmt_price(val, fiat):
     try:
-        if fiat == "idr": return f"Rp {val:,.0f}".replace(",", ".")
-        if fiat in ("usd","usdt"): return f"${val:,.2f}"
-        if fiat == "eur": return f"€{val:,.2f}"
+        fmt = _FMTS.get(fiat)
+        if fmt:
+            return fmt(val)
         return f"{val:,.4f} {fiat.upper()}"
     except Exception:
         return f"{val} {fiat.upper()}"
 
+# Cache harga ber-TTL: burst pertanyaan pair yang sama dalam 20 detik
+# cukup satu round-trip CoinGecko.
+_PRICE_TTL = 20
+_PRICE_CACHE = {}  # (ids_sorted, fiat) -> (ts, data)
+
 def fetch_price(ids, fiat: str) -> dict:
-    r = requests.get(COINGECKO_SIMPLE,
+    key = (tuple(sorted(ids)), fiat)
+    hit = _PRICE_CACHE.get(key)
+    now = time.monotonic()
+    if hit and now - hit[0] < _PRICE_TTL:
+        return hit[1]
+    r = SESSION.get(COINGECKO_SIMPLE,
         params={"ids": ",".join(ids), "vs_currencies": fiat, "include_24hr_change": "true"},
         timeout=20)
     r.raise_for_status()
-    return r.json()
+    data = orjson.loads(r.content) if orjson is not None else r.json()
+    # buang entri basi sekalian supaya cache tidak tumbuh tanpa batas
+    for k in [k for k, v in _PRICE_CACHE.items() if now - v[0] > 3 * _PRICE_TTL]:
+        _PRICE_CACHE.pop(k, None)
+    _PRICE_CACHE[key] = (now, data)
+    return data
 
 def cg_time(ms):
     return datetime.fromtimestamp(ms/1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M")